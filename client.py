@@ -4,132 +4,531 @@
 """
 
 import requests
-import base64
+from requests.adapters import HTTPAdapter
+try:
+    import httpx  # Нужен только для режима HTTP/2
+except ImportError:
+    httpx = None
+try:
+    import zstandard as zstd  # Нужен только для сжатия в режиме POST
+except ImportError:
+    zstd = None
+try:
+    import pybase64 as base64  # SIMD-реализация, тот же API
+except ImportError:
+    import base64
 import os
 import sys
 from pathlib import Path
+import hashlib
 import json
+import math
+import mmap
+import random
+import stat
 import time
+import threading
 import urllib.parse
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait
+
+# Ответы, которые не исправятся повторной отправкой того же куска
+NON_RETRIABLE_STATUSES = {400, 404, 413}
+
+# Уже сжатые форматы: повторное сжатие только тратит процессор
+INCOMPRESSIBLE_SUFFIXES = {'.gz', '.tgz', '.zst', '.xz', '.bz2', '.zip', '.7z', '.rar',
+                           '.jpg', '.jpeg', '.png', '.mp4', '.mkv', '.mp3'}
 
 class RobustFileTransferClient:
-    def __init__(self, server_url='http://193.222.99.46:8080'):
+    def __init__(self, server_url='http://193.222.99.46:8080', concurrency=8, keep_alive=True,
+                 use_post=False, http2=False, compress=True):
         self.server_url = server_url.rstrip('/')
-        self.chunk_size = 512  # Очень маленькие куски для проблемной сети
+        self.upload_url = f"{self.server_url}/upload"
+        self.stream_url = f"{self.server_url}/upload_stream"
+        self.use_post = use_post
+        if self.use_post:
+            # Сырые байты в теле POST: размер куска подстраивается под канал
+            self.initial_chunk_size = 256 * 1024
+            self.min_chunk = 512
+            self.max_chunk = 4 * 1024 * 1024
+        else:
+            # Кусок целиком уходит в URL, base64 раздувает его до ~5.5 КБ
+            self.initial_chunk_size = 4096
+        self.chunk_size = self.initial_chunk_size
+        # Сжатие возможно только в POST: тело куска уходит как есть
+        self.compress = compress and use_post and zstd is not None
+        self._local = threading.local()
         self.max_retries = 5
-        self.retry_delay = 2
+        self.retry_delay = 2  # Базовая пауза, растет экспоненциально
+        self.max_retry_delay = 30
+        
+        # Параллельная отправка: пока один кусок ждет ответа, летят другие
+        self.concurrency = concurrency
+        self.executor = None  # Создается при первой загрузке по кускам
+        self._lock = threading.Lock()
+        self._abort = threading.Event()
+        self._sent_chunks = 0
+        self._sent_bytes = 0
+        self._last_progress = 0.0
+        self._progress_open = False
+        self._ewma_rate = None
+        self._ok_streak = 0
+        
+        # Одна сессия на все куски: соединения переиспользуются
+        self.http2 = False
+        headers = {'User-Agent': 'FileTransfer/1.0'}
+        if not keep_alive:
+            # Для сетей, где долгоживущие соединения рвутся
+            headers['Connection'] = 'close'
+        
+        if http2:
+            try:
+                # Все куски мультиплексируются в одном соединении
+                self.session = httpx.Client(
+                    http2=True,
+                    headers=headers,
+                    limits=httpx.Limits(max_connections=self.concurrency)
+                )
+                self.http2 = True
+                self._timeout_errors = (httpx.TimeoutException,)
+                self._connection_errors = (httpx.TransportError,)
+            except (AttributeError, ImportError):
+                print("⚠️ httpx[http2] не установлен, используется HTTP/1.1")
         
-        # Настройки для проблемной сети
-        self.session = requests.Session()
-        self.session.headers.update({
-            'Connection': 'close',  # Закрываем соединение после каждого запроса
-            'User-Agent': 'FileTransfer/1.0'
-        })
+        if not self.http2:
+            self.session = requests.Session()
+            adapter = HTTPAdapter(
+                pool_connections=self.concurrency,
+                pool_maxsize=self.concurrency * 2,
+                max_retries=0
+            )
+            self.session.mount('http://', adapter)
+            self.session.mount('https://', adapter)
+            self.session.headers.update(headers)
+            self._timeout_errors = (requests.exceptions.Timeout,)
+            self._connection_errors = (requests.exceptions.ConnectionError,)
     
     def upload_file(self, file_path, show_progress=True):
         """Загрузка файла с повторными попытками"""
         file_path = Path(file_path)
-        
-        if not file_path.exists():
-            print(f"❌ Файл не найден: {file_path}")
+        file_size = self._regular_file_size(file_path)
+        if file_size is None:
             return False
         
         filename = file_path.name
-        file_size = file_path.stat().st_size
+        
+        # Подстройка размера куска начинается заново для каждого файла
+        self.chunk_size = self.initial_chunk_size
+        self._ewma_rate = None
+        self._ok_streak = 0
         
         print(f"📤 Загрузка файла: {filename} ({file_size} байт)")
         print(f"🔧 Размер куска: {self.chunk_size} байт")
         
-        # Читаем файл и разбиваем на очень маленькие куски
-        chunks = []
+        # Файл читается по ходу отправки. Общая для всех кусков часть
+        # запроса кодируется один раз на файл
+        if self.use_post:
+            base = {
+                'X-Filename': urllib.parse.quote(filename),
+                'X-Size': str(file_size),
+                'Content-Type': 'application/octet-stream'
+            }
+            if self._is_compressible(file_path, file_size):
+                # Каждый кусок сжимается отдельно, сервер распаковывает их независимо
+                base['Content-Encoding'] = 'zstd'
+                print("🗜️ Сжатие zstd включено")
+        else:
+            # Сервер собирает файл по номерам кусков, поэтому их размер
+            # фиксирован и число известно заранее
+            total_chunks = math.ceil(file_size / self.chunk_size)
+            print(f"📦 Всего кусков: {total_chunks}")
+            # Сокращенные имена параметров
+            base = urllib.parse.urlencode({'f': filename, 't': total_chunks})
+        
+        self._abort.clear()
+        self._sent_chunks = 0
+        self._sent_bytes = 0
+        self._last_progress = 0.0
+        self._progress_open = False
+        
+        if file_size == 0:
+            print(f"✅ Файл {filename} пуст, отправлять нечего")
+            return True
+        
+        # Куски читаются самими воркерами в момент отправки и не копятся
+        # в очереди. pread читает по смещению без общей позиции в файле и
+        # отпускает GIL, так что чтение идет параллельно с отправкой
         with open(file_path, 'rb') as f:
-            while True:
-                chunk = f.read(self.chunk_size)
-                if not chunk:
+            fd = f.fileno()
+            if hasattr(os, 'posix_fadvise'):
+                # Подсказка ядру читать файл наперед
+                os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_SEQUENTIAL)
+            
+            if hasattr(os, 'pread'):
+                def read_chunk(offset, length):
+                    return os.pread(fd, length, offset)
+                
+                ok = self._upload_chunks(read_chunk, base, file_size, show_progress)
+            else:
+                # Без pread (Windows) — срезы файла, отображенного в память
+                with mmap.mmap(fd, 0, access=mmap.ACCESS_READ) as mm:
+                    def read_chunk(offset, length):
+                        return mm[offset:offset + length]
+                    
+                    ok = self._upload_chunks(read_chunk, base, file_size, show_progress)
+        
+        if not ok:
+            return False
+        
+        if show_progress:
+            self._print_progress(file_size)
+            self._end_progress()
+        print(f"✅ Файл {filename} успешно загружен! ({self._sent_chunks} кусков)")
+        return True
+    
+    def _upload_chunks(self, read_chunk, base, file_size, show_progress):
+        """Параллельная отправка кусков, read_chunk(смещение, длина) читает кусок"""
+        if self.executor is None:
+            self.executor = ThreadPoolExecutor(max_workers=self.concurrency)
+        
+        # Не больше concurrency кусков в полете
+        slots = threading.BoundedSemaphore(self.concurrency)
+        futures = []
+        
+        try:
+            # Последний кусок (end=1) уходит только после всех остальных
+            last_chunk = None
+            for i, (offset, length) in enumerate(self._iter_chunks(file_size)):
+                if offset + length >= file_size:
+                    last_chunk = (i, offset, length)
+                    break
+                slots.acquire()
+                if self._abort.is_set():
+                    slots.release()
                     break
-                chunks.append(chunk)
+                future = self.executor.submit(
+                    self._upload_chunk, base, read_chunk, i, offset, length, file_size, show_progress
+                )
+                future.add_done_callback(lambda _: slots.release())
+                futures.append(future)
+            
+            for future in as_completed(futures):
+                if not future.result():
+                    self._abort.set()
+                    return False
+        except BaseException:
+            # Ctrl-C или исключение из воркера: остальные задачи должны
+            # бросить повторы сразу, а не дорабатывать их до конца
+            self._abort.set()
+            raise
+        finally:
+            # Файл закрывается только после того, как все задачи отпустят его
+            for pending in futures:
+                pending.cancel()
+            wait(futures)
+        
+        if last_chunk is not None:
+            i, offset, length = last_chunk
+            return self._upload_chunk(base, read_chunk, i, offset, length, file_size, show_progress)
+        return True
+    
+    def upload_file_stream(self, file_path, show_progress=True):
+        """Загрузка файла одним POST-запросом с Transfer-Encoding: chunked"""
+        file_path = Path(file_path)
+        file_size = self._regular_file_size(file_path)
+        if file_size is None:
+            return False
+        
+        filename = file_path.name
+        headers = {
+            'X-Filename': urllib.parse.quote(filename),
+            'X-Size': str(file_size),
+            'Content-Type': 'application/octet-stream'
+        }
+        
+        print(f"📤 Потоковая загрузка файла: {filename} ({file_size} байт)")
         
-        total_chunks = len(chunks)
-        print(f"📦 Всего кусков: {total_chunks}")
+        def body():
+            # Генератор без длины: HTTP-клиент сам режет тело на chunked-блоки
+            with open(file_path, 'rb') as f:
+                while block := f.read(1024 * 1024):
+                    yield block
+                    self._sent_bytes += len(block)
+                    if show_progress:
+                        self._print_progress(file_size)
         
-        # Отправляем куски с повторными попытками
-        successful_chunks = 0
-        for i, chunk in enumerate(chunks):
-            success = False
+        # Докачки нет: при сбое поток отправляется заново с начала
+        for attempt in range(self.max_retries):
+            self._sent_bytes = 0
+            try:
+                status = self._post(self.stream_url, body(), headers, timeout=30)
+                self._end_progress()
+                if status == 200:
+                    print(f"✅ Файл {filename} успешно загружен!")
+                    return True
+                self._log(f"   ✗ Ошибка {status}")
+                if status in NON_RETRIABLE_STATUSES:
+                    return False
+            except self._timeout_errors:
+                self._log(f"   ⏰ Таймаут")
+            except self._connection_errors:
+                self._log(f"   🔌 Ошибка соединения")
+            except Exception as e:
+                self._log(f"   ❌ Ошибка: {str(e)}")
+            
+            if attempt < self.max_retries - 1:
+                delay = self._retry_delay(attempt)
+                self._log(f"   ⏳ Попытка {attempt + 2} через {delay:.1f} сек...")
+                time.sleep(delay)
+        
+        print(f"❌ Не удалось загрузить {filename} после {self.max_retries} попыток")
+        return False
+    
+    def _regular_file_size(self, file_path):
+        """Размер обычного файла за один вызов stat, None — если его нет"""
+        try:
+            st = os.stat(file_path)
+        except OSError:
+            st = None
+        if st is None or not stat.S_ISREG(st.st_mode):
+            print(f"❌ Файл не найден: {file_path}")
+            return None
+        return st.st_size
+    
+    def _is_compressible(self, file_path, file_size):
+        """Проверка по расширению и пробному сжатию первых 64 КБ"""
+        if not self.compress or file_size == 0:
+            return False
+        if file_path.suffix.lower() in INCOMPRESSIBLE_SUFFIXES:
+            return False
+        with open(file_path, 'rb') as f:
+            sample = f.read(64 * 1024)
+        return len(self._compressor().compress(sample)) < 0.9 * len(sample)
+    
+    def _compressor(self):
+        """zstd-компрессор текущего потока: ZstdCompressor не потокобезопасен"""
+        cctx = getattr(self._local, 'cctx', None)
+        if cctx is None:
+            cctx = self._local.cctx = zstd.ZstdCompressor(level=3)
+        return cctx
+    
+    def _iter_chunks(self, file_size):
+        """Разбиение файла на куски, отдает (смещение, длина)"""
+        offset = 0
+        while offset < file_size:
+            # chunk_size читается на каждом шаге: в режиме POST он меняется на ходу
+            length = min(self.chunk_size, file_size - offset)
+            yield offset, length
+            offset += length
+    
+    def _upload_chunk(self, base, read_chunk, chunk_index, offset, length, file_size, show_progress):
+        """Отправка одного куска с повторными попытками"""
+        try:
+            key = None
             for attempt in range(self.max_retries):
-                if self._send_chunk_safe(filename, chunk, i, total_chunks, attempt + 1):
-                    successful_chunks += 1
-                    success = True
+                if self._abort.is_set():
+                    return False
+                # Кусок читается заново на каждую попытку: во время паузы он
+                # не держится в памяти
+                chunk_data = read_chunk(offset, length)
+                if key is None:
+                    # Ключ идемпотентности: повтор куска, который сервер уже принял,
+                    # но ответ на который потерялся, не запишется дважды.
+                    # Смещение входит в ключ, чтобы одинаковые куски не склеились
+                    digest = hashlib.blake2b(chunk_data, digest_size=8).hexdigest()
+                    key = f"{offset}:{digest}"
+                status = self._send_chunk_safe(base, chunk_data, chunk_index, offset, file_size, key)
+                del chunk_data
+                if status == 200:
                     break
-                else:
-                    if attempt < self.max_retries - 1:
-                        print(f"   ⏳ Попытка {attempt + 2} через {self.retry_delay} сек...")
-                        time.sleep(self.retry_delay)
-            
-            if not success:
-                print(f"❌ Не удалось отправить кусок {i + 1} после {self.max_retries} попыток")
+                if status in NON_RETRIABLE_STATUSES:
+                    self._log(f"❌ Сервер отклонил кусок {chunk_index + 1} (код {status}), повтор бесполезен")
+                    self._abort.set()
+                    return False
+                if attempt < self.max_retries - 1:
+                    delay = self._retry_delay(attempt)
+                    self._log(f"   ⏳ Кусок {chunk_index + 1}: попытка {attempt + 2} "
+                              f"через {delay:.1f} сек...")
+                    # Пауза прерывается сразу, если загрузка уже отменена
+                    if self._abort.wait(delay):
+                        return False
+            else:
+                self._log(f"❌ Не удалось отправить кусок {chunk_index + 1} после {self.max_retries} попыток")
+                self._abort.set()
                 return False
-            
-            if show_progress and (i + 1) % 10 == 0:
-                progress = ((i + 1) / total_chunks) * 100
-                print(f"📊 Прогресс: {i + 1}/{total_chunks} ({progress:.1f}%)")
+        except Exception as e:
+            # Сбой вне HTTP (например, чтение файла): без флага отмены главный
+            # поток продолжил бы отправлять остаток файла
+            self._log(f"❌ Кусок {chunk_index + 1}: {str(e)}")
+            self._abort.set()
+            return False
         
-        print(f"✅ Файл {filename} успешно загружен! ({successful_chunks}/{total_chunks} кусков)")
+        with self._lock:
+            self._sent_chunks += 1
+            self._sent_bytes += length
+            # Прогресс обновляется не чаще двух раз в секунду, а не на каждый кусок
+            now = time.monotonic()
+            if show_progress and now - self._last_progress >= 0.5:
+                self._last_progress = now
+                self._print_progress(file_size)
         return True
     
-    def _send_chunk_safe(self, filename, chunk_data, chunk_index, total_chunks, attempt):
-        """Безопасная отправка куска с минимальными настройками"""
-        try:
-            # Кодируем данные в base64
-            encoded_data = base64.b64encode(chunk_data).decode('utf-8')
-            
-            # Очень простые параметры
-            params = {
-                'f': filename,  # Сокращенные имена параметров
-                'd': encoded_data,
-                'c': str(chunk_index),
-                't': str(total_chunks),
-                'end': '1' if chunk_index == total_chunks - 1 else '0'
-            }
-            
-            # Простой GET запрос с минимальными настройками
-            url = f"{self.server_url}/upload"
+    def _print_progress(self, file_size):
+        """Обновление строки прогресса на месте"""
+        progress = (self._sent_bytes / file_size) * 100 if file_size else 100.0
+        sys.stdout.write(f"\r📊 Прогресс: {self._sent_bytes}/{file_size} байт ({progress:.1f}%)")
+        sys.stdout.flush()
+        self._progress_open = True
+    
+    def _end_progress(self):
+        """Перевод строки после строки прогресса, если она открыта"""
+        with self._lock:
+            if self._progress_open:
+                sys.stdout.write('\n')
+                self._progress_open = False
+    
+    def _log(self, message):
+        """Вывод сообщения из воркера
+
+        Под общей блокировкой и с новой строки, чтобы не склеиваться
+        со строкой прогресса и с выводом других потоков
+        """
+        with self._lock:
+            if self._progress_open:
+                sys.stdout.write('\n')
+                self._progress_open = False
+            print(message)
+    
+    def _retry_delay(self, attempt):
+        """Экспоненциальная пауза с разбросом, чтобы повторы не шли залпом"""
+        delay = min(self.max_retry_delay, self.retry_delay * 2 ** attempt)
+        return delay * (0.5 + random.random())
+    
+    def _adapt_chunk_size(self, chunk_len, rtt):
+        """Подстройка размера куска по пропускной способности (rtt=None — таймаут)"""
+        with self._lock:
+            if rtt is None:
+                self.chunk_size = max(self.min_chunk, self.chunk_size // 2)
+                self._ok_streak = 0
+                return
             
-            print(f"🔄 Кусок {chunk_index + 1}/{total_chunks} (попытка {attempt})")
+            rate = chunk_len / max(rtt, 1e-6)
+            if self._ewma_rate is None or rate >= 0.9 * self._ewma_rate:
+                self._ok_streak += 1
+            else:
+                self._ok_streak = 0
+            self._ewma_rate = rate if self._ewma_rate is None else 0.8 * self._ewma_rate + 0.2 * rate
             
-            # Очень консервативные настройки
-            response = requests.get(
-                url, 
-                params=params, 
-                timeout=10,
-                headers={'Connection': 'close'}
-            )
+            # 10 кусков подряд без просадки скорости — пробуем куски крупнее
+            if self._ok_streak >= 10:
+                self.chunk_size = min(self.max_chunk, self.chunk_size * 2)
+                self._ok_streak = 0
+    
+    def _send_chunk_safe(self, base, chunk_data, chunk_index, offset, file_size, key):
+        """Безопасная отправка куска, возвращает HTTP-код или None при сбое сети
+
+        base — заранее подготовленные заголовки (POST) или строка запроса (GET),
+        key — ключ идемпотентности куска
+        """
+        try:
+            is_final = offset + len(chunk_data) >= file_size
             
-            if response.status_code == 200:
-                print(f"   ✓ Отправлено")
-                return True
+            if self.use_post:
+                # Сырые байты в теле, метаданные в заголовках. Куски разного
+                # размера, поэтому сервер собирает файл по смещениям
+                headers = {
+                    **base,
+                    'X-Offset': str(offset),
+                    'X-Final': '1' if is_final else '0',
+                    'X-Idempotency-Key': key
+                }
+                body = chunk_data
+                if 'Content-Encoding' in base:
+                    body = self._compressor().compress(chunk_data)
+                started = time.monotonic()
+                try:
+                    status = self._post(self.upload_url, body, headers, timeout=30)
+                except self._timeout_errors:
+                    self._adapt_chunk_size(len(chunk_data), None)
+                    raise
+                if status == 200:
+                    self._adapt_chunk_size(len(chunk_data), time.monotonic() - started)
             else:
-                print(f"   ✗ Ошибка {response.status_code}")
-                return False
+                # Кодируем данные в base64. Байты идут в urlencode напрямую,
+                # без промежуточной строки
+                encoded_data = base64.b64encode(chunk_data)
                 
-        except requests.exceptions.Timeout:
-            print(f"   ⏰ Таймаут")
-            return False
-        except requests.exceptions.ConnectionError:
-            print(f"   🔌 Ошибка соединения")
-            return False
+                # Очень простые параметры, имя файла и число кусков уже в base
+                params = base + '&' + urllib.parse.urlencode({
+                    'd': encoded_data,
+                    'c': chunk_index,
+                    'end': '1' if is_final else '0'
+                })
+                
+                # Простой GET запрос с минимальными настройками
+                status = self._get(
+                    self.upload_url, 
+                    params=params, 
+                    headers={'X-Idempotency-Key': key},
+                    timeout=10
+                )
+            
+            if status != 200:
+                self._log(f"   ✗ Кусок {chunk_index + 1}: ошибка {status}")
+            return status
+                
+        except self._timeout_errors:
+            self._log(f"   ⏰ Кусок {chunk_index + 1}: таймаут")
+            return None
+        except self._connection_errors:
+            self._log(f"   🔌 Кусок {chunk_index + 1}: ошибка соединения")
+            return None
         except Exception as e:
-            print(f"   ❌ Ошибка: {str(e)}")
-            return False
+            self._log(f"   ❌ Кусок {chunk_index + 1}: {str(e)}")
+            return None
+    
+    def _get(self, url, params, headers, timeout):
+        """GET, возвращает только HTTP-код"""
+        if self.http2:
+            return self.session.get(url, params=params, headers=headers, timeout=timeout).status_code
+        return self._status_only(self.session.get(
+            url, params=params, headers=headers, timeout=timeout, stream=True
+        ))
+    
+    def _post(self, url, body, headers, timeout):
+        """POST с сырым телом, возвращает только HTTP-код
+
+        У requests и httpx разные имена аргумента для тела
+        """
+        if self.http2:
+            return self.session.post(url, content=body, headers=headers, timeout=timeout).status_code
+        return self._status_only(self.session.post(
+            url, data=body, headers=headers, timeout=timeout, stream=True
+        ))
+    
+    def _status_only(self, response):
+        """Код ответа без чтения тела в память
+
+        Тело дочитывается вхолостую, чтобы соединение вернулось в пул
+        """
+        status = response.status_code
+        response.raw.drain_conn()
+        response.close()
+        return status
+    
+    def close(self):
+        """Остановка пула потоков и закрытие соединений"""
+        if self.executor is not None:
+            self.executor.shutdown(wait=True)
+            self.executor = None
+        self.session.close()
     
     def test_connection_simple(self):
         """Простая проверка соединения"""
         try:
             print(f"🔍 Проверка {self.server_url}")
-            response = requests.get(
+            response = self.session.get(
                 f"{self.server_url}/", 
-                timeout=5,
-                headers={'Connection': 'close'}
+                timeout=5
             )
             if response.status_code == 200:
                 print("✅ Сервер отвечает")
@@ -144,7 +543,7 @@ class RobustFileTransferClient:
     def send_test_data(self):
         """Отправка тестовых данных"""
         test_data = b"Hello World Test"
-        encoded = base64.b64encode(test_data).decode('utf-8')
+        encoded = base64.b64encode(test_data).decode('ascii')
         
         try:
             params = {
@@ -155,11 +554,10 @@ class RobustFileTransferClient:
                 'end': '1'
             }
             
-            response = requests.get(
-                f"{self.server_url}/upload",
+            response = self.session.get(
+                self.upload_url,
                 params=params,
-                timeout=10,
-                headers={'Connection': 'close'}
+                timeout=10
             )
             
             if response.status_code == 200:
@@ -172,42 +570,101 @@ class RobustFileTransferClient:
             print(f"❌ Ошибка теста: {str(e)}")
             return False
 
+def print_usage():
+    print("🚀 Устойчивый File Transfer Client")
+    print("Использование:")
+    print(f"  {sys.argv[0]} <файл> [сервер] [опции]")
+    print(f"  {sys.argv[0]} --test [сервер]")
+    print("Опции:")
+    print("  --concurrency N   кусков в полете одновременно (по умолчанию 8)")
+    print("  --no-keepalive    закрывать соединение после каждого запроса")
+    print("  --post            сырые байты в теле POST вместо base64 в URL")
+    print("  --http2           HTTP/2 через httpx, если установлен")
+    print("  --no-compress     не сжимать куски zstd в режиме --post")
+    print("  --stream          весь файл одним потоковым POST-запросом")
+    print("Примеры:")
+    print(f"  {sys.argv[0]} document.txt")
+    print(f"  {sys.argv[0]} document.txt --concurrency 4")
+    print(f"  {sys.argv[0]} --test http://192.168.1.100:8080")
+
 def main():
-    if len(sys.argv) < 2:
-        print("🚀 Устойчивый File Transfer Client")
-        print("Использование:")
-        print(f"  {sys.argv[0]} <файл> [сервер]")
-        print(f"  {sys.argv[0]} --test [сервер]")
-        print("Примеры:")
-        print(f"  {sys.argv[0]} document.txt")
-        print(f"  {sys.argv[0]} --test http://192.168.1.100:8080")
+    args = sys.argv[1:]
+    concurrency = 8
+    keep_alive = True
+    use_post = False
+    http2 = False
+    compress = True
+    stream = False
+    if '--stream' in args:
+        stream = True
+        args.remove('--stream')
+    if '--no-compress' in args:
+        compress = False
+        args.remove('--no-compress')
+    if '--http2' in args:
+        http2 = True
+        args.remove('--http2')
+    if '--post' in args:
+        use_post = True
+        args.remove('--post')
+    if '--no-keepalive' in args:
+        keep_alive = False
+        args.remove('--no-keepalive')
+    if '--concurrency' in args:
+        idx = args.index('--concurrency')
+        value = args[idx + 1] if idx + 1 < len(args) else None
+        try:
+            concurrency = int(value)
+        except (TypeError, ValueError):
+            concurrency = 0
+        if concurrency < 1:
+            print(f"❌ --concurrency ожидает целое число от 1, получено: {value or 'ничего'}")
+            print_usage()
+            return
+        del args[idx:idx + 2]
+    
+    if len(args) < 1:
+        print_usage()
         return
     
     server_url = 'http://localhost:8080'
-    if len(sys.argv) > 2:
-        server_url = sys.argv[2]
-    
-    client = RobustFileTransferClient(server_url)
-    
-    if sys.argv[1] == '--test':
-        print("🧪 Запуск диагностики сети...")
-        client.test_connection_simple()
-        print("📤 Тест передачи данных...")
-        client.send_test_data()
-    else:
-        file_path = sys.argv[1]
-        print("🔧 Режим для проблемной сети активирован")
-        
-        if client.test_connection_simple():
-            print()
-            start_time = time.time()
-            success = client.upload_file(file_path)
-            end_time = time.time()
-            
-            if success:
-                print(f"⏱️ Время: {end_time - start_time:.1f} сек")
+    if len(args) > 1:
+        server_url = args[1]
+    
+    client = RobustFileTransferClient(
+        server_url,
+        concurrency=concurrency,
+        keep_alive=keep_alive,
+        use_post=use_post,
+        http2=http2,
+        compress=compress
+    )
+    
+    try:
+        if args[0] == '--test':
+            print("🧪 Запуск диагностики сети...")
+            client.test_connection_simple()
+            print("📤 Тест передачи данных...")
+            client.send_test_data()
         else:
-            print("❌ Сервер недоступен")
+            file_path = args[0]
+            print("🔧 Режим для проблемной сети активирован")
+            
+            if client.test_connection_simple():
+                print()
+                start_time = time.time()
+                if stream:
+                    success = client.upload_file_stream(file_path)
+                else:
+                    success = client.upload_file(file_path)
+                end_time = time.time()
+                
+                if success:
+                    print(f"⏱️ Время: {end_time - start_time:.1f} сек")
+            else:
+                print("❌ Сервер недоступен")
+    finally:
+        client.close()
 
 if __name__ == '__main__':
     main()